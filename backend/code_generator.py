@@ -1,66 +1,95 @@
+from string import Template
 from typing import Dict, Any
 
-def generate_pseudocode(strategy: str, params: Dict[str, Any]) -> str:
-    if strategy == "SMA_CROSSOVER":
-        return f"""LOGIC EXPLANATION:
-1. Calculate the Short-term Moving Average (SMA) over {params.get('shortWindow')} days.
-2. Calculate the Long-term Moving Average (SMA) over {params.get('longWindow')} days.
+# 模板在 import 时就拼好：每个 (strategy, framework) 一个完整 Template，
+# 请求时只做一次 substitute，不再重复 if/elif + 字符串拼接 (O(n²) copy)。
+# string.Template 用 $ 占位符，生成代码里的 {} 花括号不需要转义。
+
+class _ParamMap(dict):
+    # f-string 时代缺失参数会打印 "None"，保持同样行为
+    def __missing__(self, key):
+        return 'None'
+
+
+def _render(template: Template, ticker: str, params: Dict[str, Any], fees: float, slippage: float) -> str:
+    mapping = _ParamMap(params)
+    mapping.update({
+        "ticker": ticker,
+        "fees": fees,
+        "slippage": slippage,
+        "initialCapital": params.get('initialCapital', 10000),
+    })
+    return template.substitute(mapping)
+
+
+# --- Pseudocode ---
+
+_PSEUDO_TEMPLATES = {
+    "SMA_CROSSOVER": Template("""LOGIC EXPLANATION:
+1. Calculate the Short-term Moving Average (SMA) over $shortWindow days.
+2. Calculate the Long-term Moving Average (SMA) over $longWindow days.
 3. BUY SIGNAL: When the Short SMA crosses ABOVE the Long SMA.
    -> This indicates momentum is shifting upwards (Golden Cross).
 4. SELL SIGNAL: When the Short SMA crosses BELOW the Long SMA.
    -> This indicates momentum is shifting downwards (Death Cross).
-"""
-    elif strategy == "RSI_REVERSAL":
-        return f"""LOGIC EXPLANATION:
-1. Calculate the Relative Strength Index (RSI) over {params.get('rsiPeriod')} days.
-2. BUY SIGNAL: When RSI drops below {params.get('rsiOversold')}.
+"""),
+    "RSI_REVERSAL": Template("""LOGIC EXPLANATION:
+1. Calculate the Relative Strength Index (RSI) over $rsiPeriod days.
+2. BUY SIGNAL: When RSI drops below $rsiOversold.
    -> The asset is considered 'Oversold' and might bounce back.
-3. SELL SIGNAL: When RSI rises above {params.get('rsiOverbought')}.
+3. SELL SIGNAL: When RSI rises above $rsiOverbought.
    -> The asset is considered 'Overbought' and might correct.
-"""
+"""),
     # ... 其他策略可以按需补充 ...
-    return "Logic description not available for this strategy."
+}
 
-def generate_vectorbt_code(ticker: str, strategy: str, params: Dict[str, Any], fees: float, slippage: float) -> str:
-    # 基础头部
-    code = f"""import vectorbt as vbt
+
+def generate_pseudocode(strategy: str, params: Dict[str, Any]) -> str:
+    template = _PSEUDO_TEMPLATES.get(strategy)
+    if template is None:
+        return "Logic description not available for this strategy."
+    return template.substitute(_ParamMap(params))
+
+
+# --- vectorbt ---
+
+_VBT_HEADER = """import vectorbt as vbt
 import yfinance as yf
 
 # 1. Configuration
-SYMBOL = "{ticker}"
-FEES = {fees}
-SLIPPAGE = {slippage}
-CAPITAL = {params.get('initialCapital', 10000)}
+SYMBOL = "$ticker"
+FEES = $fees
+SLIPPAGE = $slippage
+CAPITAL = $initialCapital
 
 # 2. Fetch Data
-print(f"Fetching data for {{SYMBOL}}...")
+print(f"Fetching data for {SYMBOL}...")
 data = yf.Ticker(SYMBOL).history(period="2y", auto_adjust=True)
 close = data['Close']
 open_price = data['Open']
 
-# 3. Strategy Logic: {strategy}
+# 3. Strategy Logic: $strategy
 """
-    # 策略特定逻辑
-    if strategy == "SMA_CROSSOVER":
-        code += f"""
-fast_ma = vbt.MA.run(close, {params.get('shortWindow')})
-slow_ma = vbt.MA.run(close, {params.get('longWindow')})
+
+_VBT_BODIES = {
+    "SMA_CROSSOVER": """
+fast_ma = vbt.MA.run(close, $shortWindow)
+slow_ma = vbt.MA.run(close, $longWindow)
 
 entries = fast_ma.ma_crossed_above(slow_ma)
 exits = fast_ma.ma_crossed_below(slow_ma)
-"""
-    elif strategy == "RSI_REVERSAL":
-        code += f"""
-rsi = vbt.RSI.run(close, window={params.get('rsiPeriod')})
-entries = rsi.rsi_crossed_below({params.get('rsiOversold')})
-exits = rsi.rsi_crossed_above({params.get('rsiOverbought')})
-"""
+""",
+    "RSI_REVERSAL": """
+rsi = vbt.RSI.run(close, window=$rsiPeriod)
+entries = rsi.rsi_crossed_below($rsiOversold)
+exits = rsi.rsi_crossed_above($rsiOverbought)
+""",
     # ... 其他策略 ...
-    else:
-        code += "\n# Strategy logic placeholder\nentries = close > close.shift(1)\nexits = close < close.shift(1)\n"
+}
+
+_VBT_DEFAULT_BODY = "\n# Strategy logic placeholder\nentries = close > close.shift(1)\nexits = close < close.shift(1)\n"
 
-    # 通用尾部
-    code += """
+_VBT_FOOTER = """
 # 4. Reality Check (Prevent Look-ahead Bias)
 # Shift signals to execute on the NEXT open
 real_entries = entries.vbt.signals.fshift(1)
@@ -84,83 +113,95 @@ pf = vbt.Portfolio.from_signals(
 print(pf.stats())
 pf.plot().show()
 """
-    return code
 
-def generate_backtrader_code(ticker: str, strategy: str, params: Dict[str, Any], fees: float, slippage: float) -> str:
-    code = f"""import backtrader as bt
+_VBT_TEMPLATES = {
+    strategy: Template(_VBT_HEADER + body + _VBT_FOOTER)
+    for strategy, body in _VBT_BODIES.items()
+}
+_VBT_FALLBACK = Template(_VBT_HEADER + _VBT_DEFAULT_BODY + _VBT_FOOTER)
+
+
+def generate_vectorbt_code(ticker: str, strategy: str, params: Dict[str, Any], fees: float, slippage: float) -> str:
+    template = _VBT_TEMPLATES.get(strategy, _VBT_FALLBACK)
+    mapping = _ParamMap(params)
+    mapping.update({
+        "ticker": ticker,
+        "fees": fees,
+        "slippage": slippage,
+        "initialCapital": params.get('initialCapital', 10000),
+        "strategy": strategy,
+    })
+    return template.substitute(mapping)
+
+
+# --- backtrader ---
+
+_BT_HEADER = """import backtrader as bt
 import yfinance as yf
 
 class MyStrategy(bt.Strategy):
     params = (
-"""
-    # 参数定义
-    for k, v in params.items():
-        if isinstance(v, (int, float)):
-            code += f"        ('{k}', {v}),\n"
-            
-    code += f"""    )
+$param_lines    )
 
     def __init__(self):
         self.dataclose = self.datas[0].close
         self.order = None
 """
-    
-    # 策略初始化
-    if strategy == "SMA_CROSSOVER":
-        code += f"""
+
+_BT_INIT = {
+    "SMA_CROSSOVER": """
         self.fast_ma = bt.indicators.SimpleMovingAverage(
             self.datas[0], period=self.params.shortWindow)
         self.slow_ma = bt.indicators.SimpleMovingAverage(
             self.datas[0], period=self.params.longWindow)
         self.crossover = bt.ind.CrossOver(self.fast_ma, self.slow_ma)
-"""
-    elif strategy == "RSI_REVERSAL":
-        code += f"""
+""",
+    "RSI_REVERSAL": """
         self.rsi = bt.indicators.RSI(self.datas[0], period=self.params.rsiPeriod)
-"""
+""",
+}
 
-    code += """
+_BT_NEXT_OPEN = """
     def next(self):
         if self.order:
             return  # Pending order exists
 
         if not self.position:
 """
-    # 买入逻辑
-    if strategy == "SMA_CROSSOVER":
-        code += """            if self.crossover > 0:
+
+_BT_BUY = {
+    "SMA_CROSSOVER": """            if self.crossover > 0:
                 self.buy()
-"""
-    elif strategy == "RSI_REVERSAL":
-        code += """            if self.rsi < self.params.rsiOversold:
+""",
+    "RSI_REVERSAL": """            if self.rsi < self.params.rsiOversold:
                 self.buy()
+""",
+}
+
+_BT_ELSE = """        else:
 """
-    
-    code += """        else:
-"""
-    # 卖出逻辑
-    if strategy == "SMA_CROSSOVER":
-        code += """            if self.crossover < 0:
+
+_BT_SELL = {
+    "SMA_CROSSOVER": """            if self.crossover < 0:
                 self.close()
-"""
-    elif strategy == "RSI_REVERSAL":
-        code += """            if self.rsi > self.params.rsiOverbought:
+""",
+    "RSI_REVERSAL": """            if self.rsi > self.params.rsiOverbought:
                 self.close()
-"""
+""",
+}
 
-    # 运行逻辑
-    code += f"""
+_BT_FOOTER = """
 if __name__ == '__main__':
     cerebro = bt.Cerebro()
     cerebro.addstrategy(MyStrategy)
 
     # Data Feed
-    data = bt.feeds.PandasData(dataname=yf.download('{ticker}', period='2y', auto_adjust=True))
+    data = bt.feeds.PandasData(dataname=yf.download('$ticker', period='2y', auto_adjust=True))
     cerebro.adddata(data)
 
     # Broker Settings
-    cerebro.broker.setcash({params.get('initialCapital', 10000)})
-    cerebro.broker.setcommission(commission={fees})
+    cerebro.broker.setcash($initialCapital)
+    cerebro.broker.setcommission(commission=$fees)
     # Note: Backtrader slippage handling is more complex, usually done via slippage_perc
 
     print('Starting Portfolio Value: %.2f' % cerebro.broker.getvalue())
@@ -168,4 +209,27 @@ if __name__ == '__main__':
     print('Final Portfolio Value: %.2f' % cerebro.broker.getvalue())
     cerebro.plot()
 """
-    return code
\ No newline at end of file
+
+_BT_TEMPLATES = {
+    strategy: Template(
+        _BT_HEADER + _BT_INIT[strategy] + _BT_NEXT_OPEN + _BT_BUY[strategy] + _BT_ELSE + _BT_SELL[strategy] + _BT_FOOTER
+    )
+    for strategy in _BT_INIT
+}
+_BT_FALLBACK = Template(_BT_HEADER + _BT_NEXT_OPEN + _BT_ELSE + _BT_FOOTER)
+
+
+def generate_backtrader_code(ticker: str, strategy: str, params: Dict[str, Any], fees: float, slippage: float) -> str:
+    template = _BT_TEMPLATES.get(strategy, _BT_FALLBACK)
+    # 参数定义 (数值参数动态生成，策略无关)
+    param_lines = "".join(
+        f"        ('{k}', {v}),\n" for k, v in params.items() if isinstance(v, (int, float))
+    )
+    mapping = _ParamMap(params)
+    mapping.update({
+        "ticker": ticker,
+        "fees": fees,
+        "initialCapital": params.get('initialCapital', 10000),
+        "param_lines": param_lines,
+    })
+    return template.substitute(mapping)
@@ -0,0 +1,387 @@
+"""Numba-JIT strategy kernels.
+
+Pure ndarray in / ndarray out: the vectorbt IndicatorFactory wrappers build
+parameter grids and indicator objects we never use, which dominates the
+screener/stress paths where a strategy runs dozens of times per request.
+SakuraEngine hands these kernels raw close arrays and wraps the results back
+into pandas Series only at the boundary.
+"""
+import numpy as np
+
+try:
+    from numba import njit
+    NUMBA_AVAILABLE = True
+except ImportError:  # pragma: no cover - numba is in requirements
+    NUMBA_AVAILABLE = False
+
+    def njit(*args, **kwargs):
+        def wrap(fn):
+            return fn
+        if args and callable(args[0]):
+            return args[0]
+        return wrap
+
+
+# The strategy kernels are fused: one loop over close emits signals and
+# indicator values together, instead of separate rolling/ewm/crossover passes
+# each re-reading the same array. Same arithmetic, a fraction of the memory
+# traffic. NaN warmup bars compare False on both sides, so they never signal.
+
+@njit(cache=True)
+def sma_cross(close, s_window, l_window):
+    n = close.size
+    entries = np.zeros(n, np.bool_)
+    exits = np.zeros(n, np.bool_)
+    fast = np.full(n, np.nan)
+    slow = np.full(n, np.nan)
+    fs = 0.0
+    ls = 0.0
+    f_prev = np.nan
+    s_prev = np.nan
+    for i in range(n):
+        fs += close[i]
+        ls += close[i]
+        if i >= s_window:
+            fs -= close[i - s_window]
+        if i >= l_window:
+            ls -= close[i - l_window]
+        f = fs / s_window if i >= s_window - 1 else np.nan
+        s = ls / l_window if i >= l_window - 1 else np.nan
+        fast[i] = f
+        slow[i] = s
+        if i > 0:
+            entries[i] = f > s and f_prev <= s_prev
+            exits[i] = s > f and s_prev <= f_prev
+        f_prev = f
+        s_prev = s
+    return entries, exits, fast, slow
+
+
+@njit(cache=True)
+def ema_cross(close, s_window, l_window):
+    n = close.size
+    entries = np.zeros(n, np.bool_)
+    exits = np.zeros(n, np.bool_)
+    fast = np.empty(n)
+    slow = np.empty(n)
+    if n == 0:
+        return entries, exits, fast, slow
+    a_f = 2.0 / (s_window + 1.0)
+    a_s = 2.0 / (l_window + 1.0)
+    f = close[0]
+    s = close[0]
+    fast[0] = f
+    slow[0] = s
+    for i in range(1, n):
+        f_prev = f
+        s_prev = s
+        f = f + a_f * (close[i] - f)
+        s = s + a_s * (close[i] - s)
+        fast[i] = f
+        slow[i] = s
+        entries[i] = f > s and f_prev <= s_prev
+        exits[i] = s > f and s_prev <= f_prev
+    # The vbt MAs this replaces were NaN for the first window-1 bars
+    # (min_periods), so no crossing could fire before the slow window filled.
+    # The seeded recursion has values from bar 0; mask the seed region so the
+    # signal timeline matches.
+    entries[:l_window] = False
+    exits[:l_window] = False
+    return entries, exits, fast, slow
+
+
+@njit(cache=True)
+def rsi_cross(close, period, oversold, overbought):
+    n = close.size
+    entries = np.zeros(n, np.bool_)
+    exits = np.zeros(n, np.bool_)
+    rsi = np.full(n, np.nan)
+    if n < 2:
+        return entries, exits, rsi
+    alpha = 1.0 / period
+    up = 0.0
+    down = 0.0
+    r_prev = np.nan
+    for i in range(1, n):
+        d = close[i] - close[i - 1]
+        u = d if d > 0 else 0.0
+        dn = -d if d < 0 else 0.0
+        if i == 1:
+            up = u
+            down = dn
+        else:
+            up = up + alpha * (u - up)
+            down = down + alpha * (dn - down)
+        denom = up + down
+        r = 100.0 * up / denom if denom > 0 else np.nan
+        rsi[i] = r
+        entries[i] = r < oversold and r_prev >= oversold
+        exits[i] = r > overbought and r_prev <= overbought
+        r_prev = r
+    return entries, exits, rsi
+
+
+@njit(cache=True)
+def bbands_break(close, period, alpha):
+    n = close.size
+    entries = np.zeros(n, np.bool_)
+    exits = np.zeros(n, np.bool_)
+    upper = np.full(n, np.nan)
+    lower = np.full(n, np.nan)
+    if period <= 1 or n < period:
+        return entries, exits, upper, lower
+    s = 0.0
+    s2 = 0.0
+    for i in range(n):
+        s += close[i]
+        s2 += close[i] * close[i]
+        if i >= period:
+            s -= close[i - period]
+            s2 -= close[i - period] * close[i - period]
+        if i >= period - 1:
+            m = s / period
+            v = (s2 - period * m * m) / (period - 1)
+            sd = np.sqrt(v) if v > 0 else 0.0
+            u = m + alpha * sd
+            l = m - alpha * sd
+            upper[i] = u
+            lower[i] = l
+            entries[i] = close[i] < l
+            exits[i] = close[i] > u
+    return entries, exits, upper, lower
+
+
+@njit(cache=True)
+def macd_cross(close, fast_window, slow_window, signal_window):
+    n = close.size
+    entries = np.zeros(n, np.bool_)
+    exits = np.zeros(n, np.bool_)
+    macd = np.empty(n)
+    signal = np.empty(n)
+    hist = np.empty(n)
+    if n == 0:
+        return entries, exits, macd, signal, hist
+    a_f = 2.0 / (fast_window + 1.0)
+    a_s = 2.0 / (slow_window + 1.0)
+    a_sig = 2.0 / (signal_window + 1.0)
+    ef = close[0]
+    es = close[0]
+    m = ef - es
+    sig = m
+    macd[0] = m
+    signal[0] = sig
+    hist[0] = 0.0
+    for i in range(1, n):
+        m_prev = m
+        sig_prev = sig
+        ef = ef + a_f * (close[i] - ef)
+        es = es + a_s * (close[i] - es)
+        m = ef - es
+        sig = sig + a_sig * (m - sig)
+        macd[i] = m
+        signal[i] = sig
+        hist[i] = m - sig
+        entries[i] = m > sig and m_prev <= sig_prev
+        exits[i] = sig > m and sig_prev <= m_prev
+    # Same warmup masking as ema_cross: the MACD line needs slow_window bars
+    # and the signal line another signal_window on top before the baseline
+    # ewm pipeline produced values, so no cross is valid before then.
+    entries[:slow_window + signal_window - 1] = False
+    exits[:slow_window + signal_window - 1] = False
+    return entries, exits, macd, signal, hist
+
+
+@njit(cache=True)
+def roc_zero(close, period):
+    n = close.size
+    entries = np.zeros(n, np.bool_)
+    exits = np.zeros(n, np.bool_)
+    roc = np.full(n, np.nan)
+    r_prev = np.nan
+    for i in range(period, n):
+        r = (close[i] - close[i - period]) / close[i - period] * 100.0
+        roc[i] = r
+        entries[i] = r > 0.0 and r_prev <= 0.0
+        exits[i] = r < 0.0 and r_prev >= 0.0
+        r_prev = r
+    return entries, exits, roc
+
+
+@njit(cache=True)
+def keltner(high, low, close, ema_period, atr_period, mult):
+    """Fused Keltner channel: recursive EMA middle, span-smoothed ATR and
+    the band/signal comparisons in one sweep. Both recursions use the
+    span alpha 2/(w+1) and seed from bar 0 (EMA with close[0], ATR with
+    the first true range), matching vbt.ATR's default ewm smoothing."""
+    n = close.size
+    entries = np.zeros(n, np.bool_)
+    exits = np.zeros(n, np.bool_)
+    upper = np.empty(n)
+    lower = np.empty(n)
+    middle = np.empty(n)
+    if n == 0:
+        return entries, exits, upper, lower, middle
+    a_ema = 2.0 / (ema_period + 1.0)
+    a_atr = 2.0 / (atr_period + 1.0)
+    ema = close[0]
+    atr = high[0] - low[0]
+    middle[0] = ema
+    upper[0] = ema + mult * atr
+    lower[0] = ema - mult * atr
+    entries[0] = close[0] > upper[0]
+    exits[0] = close[0] < ema
+    for i in range(1, n):
+        tr = high[i] - low[i]
+        a = abs(high[i] - close[i - 1])
+        if a > tr:
+            tr = a
+        b = abs(low[i] - close[i - 1])
+        if b > tr:
+            tr = b
+        atr = atr + a_atr * (tr - atr)
+        ema = ema + a_ema * (close[i] - ema)
+        u = ema + mult * atr
+        lo = ema - mult * atr
+        middle[i] = ema
+        upper[i] = u
+        lower[i] = lo
+        entries[i] = close[i] > u
+        exits[i] = close[i] < ema
+    # Bands are only meaningful once the longer of the two lookbacks has
+    # seen a full window of bars; vbt's min_periods kept them NaN (and the
+    # comparisons False) until then.
+    warm = max(ema_period, atr_period) - 1
+    entries[:warm] = False
+    exits[:warm] = False
+    return entries, exits, upper, lower, middle
+
+
+@njit(cache=True)
+def adx_wilder(high, low, close, period):
+    """Fused ADX: true range, +DM/-DM smoothing, DX and the final rolling
+    mean all in one left-to-right pass. Mirrors the pandas pipeline in
+    SakuraEngine._calculate_adx, including its adjust=True ewm weighting
+    (tracked as a numerator/denominator pair) and NaN-propagating rolling
+    means, so both paths produce the same series."""
+    n = high.size
+    out = np.full(n, np.nan)
+    if period <= 0 or n < period:
+        return out
+    decay = 1.0 - 1.0 / period
+    tr_buf = np.zeros(period)
+    tr_sum = 0.0
+    dx_buf = np.full(period, np.nan)
+    dx_sum = 0.0
+    dx_nan = period  # NaN slots in the dx window; adx stays NaN until it fills
+    pnum = 0.0
+    mnum = 0.0
+    wden = 0.0
+    for i in range(n):
+        if i == 0:
+            tr = high[0] - low[0]
+        else:
+            tr = high[i] - low[i]
+            a = abs(high[i] - close[i - 1])
+            if a > tr:
+                tr = a
+            b = abs(low[i] - close[i - 1])
+            if b > tr:
+                tr = b
+            up = high[i] - high[i - 1]
+            dn = low[i] - low[i - 1]
+            pdm = up if up > 0 else 0.0
+            mdm = -dn if dn < 0 else 0.0
+            pnum = pdm + decay * pnum
+            mnum = mdm + decay * mnum
+            wden = 1.0 + decay * wden
+        j = i % period
+        tr_sum += tr - tr_buf[j]
+        tr_buf[j] = tr
+        dx = np.nan
+        if i >= period - 1 and i >= 1:
+            atr = tr_sum / period
+            if atr > 0.0:
+                pdi = 100.0 * (pnum / wden) / atr
+                mdi = 100.0 * (mnum / wden) / atr
+                denom = abs(pdi + mdi)
+                if denom > 0.0:
+                    dx = abs(pdi - mdi) / denom * 100.0
+        old = dx_buf[j]
+        if np.isnan(old):
+            dx_nan -= 1
+        else:
+            dx_sum -= old
+        if np.isnan(dx):
+            dx_nan += 1
+        else:
+            dx_sum += dx
+        dx_buf[j] = dx
+        if dx_nan == 0:
+            out[i] = dx_sum / period
+    return out
+
+
+# Optional TA-Lib binding. When the C library happens to be installed it is
+# the fastest ADX around; bind TA_ADX once via ctypes and let callers fall
+# back when it's absent (the numba kernel remains the primary path).
+_TA_ADX = None
+try:
+    import ctypes
+    import ctypes.util
+
+    _ta_path = ctypes.util.find_library('ta_lib') or ctypes.util.find_library('ta-lib')
+    if _ta_path:
+        _ta = ctypes.CDLL(_ta_path)
+        _ta.TA_ADX.argtypes = [ctypes.c_int, ctypes.c_int,
+                               ctypes.c_void_p, ctypes.c_void_p, ctypes.c_void_p,
+                               ctypes.c_int,
+                               ctypes.POINTER(ctypes.c_int), ctypes.POINTER(ctypes.c_int),
+                               ctypes.c_void_p]
+        _ta.TA_ADX.restype = ctypes.c_int
+        _TA_ADX = _ta.TA_ADX
+except (OSError, AttributeError):  # pragma: no cover - lib present but unusable
+    _TA_ADX = None
+
+
+def adx_talib(high, low, close, period):
+    """ADX through TA-Lib's C implementation. Inputs must be contiguous
+    float64. Returns None when the library is missing or the call fails so
+    the caller can fall through to another implementation. Note TA-Lib's
+    lookback and pure-Wilder smoothing differ slightly from the pandas
+    pipeline's adjust=True weighting in the warmup region."""
+    if _TA_ADX is None:
+        return None
+    n = close.size
+    out = np.full(n, np.nan)
+    if n == 0:
+        return out
+    beg = ctypes.c_int(0)
+    nb = ctypes.c_int(0)
+    buf = np.empty(n)
+    ret = _TA_ADX(0, n - 1,
+                  high.ctypes.data_as(ctypes.c_void_p),
+                  low.ctypes.data_as(ctypes.c_void_p),
+                  close.ctypes.data_as(ctypes.c_void_p),
+                  period,
+                  ctypes.byref(beg), ctypes.byref(nb),
+                  buf.ctypes.data_as(ctypes.c_void_p))
+    if ret != 0 or nb.value <= 0:
+        return None
+    out[beg.value:beg.value + nb.value] = buf[:nb.value]
+    return out
+
+
+def warmup():
+    """Compile every kernel once on a tiny array so the first real request
+    never pays JIT cost. With cache=True this is near-instant after the first
+    boot (compiled code is loaded from the on-disk cache); main.py runs it in
+    a daemon thread at startup."""
+    x = np.linspace(1.0, 2.0, 64)
+    sma_cross(x, 3, 5)
+    ema_cross(x, 3, 5)
+    rsi_cross(x, 5, 30.0, 70.0)
+    bbands_break(x, 5, 2.0)
+    macd_cross(x, 3, 6, 2)
+    roc_zero(x, 3)
+    adx_wilder(x + 1.0, x - 1.0, x, 5)
+    keltner(x + 1.0, x - 1.0, x, 5, 5, 2.0)
@@ -1,23 +1,49 @@
 import uvicorn
-from fastapi import FastAPI, HTTPException, Query, APIRouter, Body
+from fastapi import FastAPI, HTTPException, Query, APIRouter, Body, Request, Response
+from fastapi.responses import ORJSONResponse
 from fastapi.staticfiles import StaticFiles
 from fastapi.middleware.cors import CORSMiddleware
-from pydantic import BaseModel
+from pydantic import BaseModel, ConfigDict
 from typing import List, Dict, Any, Optional
 import yfinance as yf
 import pandas as pd
 import numpy as np
 from pathlib import Path
 from datetime import datetime, timedelta
+import asyncio
+import bisect
 import concurrent.futures
+import functools
+import logging
+import os
+import pickle
 import sqlite3
+import threading
 import json
 import hashlib
+import hmac
+import time
+
+# print() grabs the stdout lock on every request; route diagnostics through
+# logging instead so they can be silenced (default WARNING) without code edits
+logging.basicConfig(level=os.environ.get("QUANTFORGE_LOG_LEVEL", "WARNING"))
+log = logging.getLogger("quantforge")
+
+try:
+    from yahooquery import search as _yq_search
+except ImportError:
+    _yq_search = None  # search falls back to the local index only
 
 from quant_engine import SakuraEngine
 from code_generator import generate_pseudocode, generate_vectorbt_code, generate_backtrader_code
+import engine_kernels
 
-app = FastAPI(title="QuantForge Pro", version="2.0.0")
+# Compile the numba kernels off the request path so the first screener call
+# after boot doesn't eat the JIT warmup
+threading.Thread(target=engine_kernels.warmup, daemon=True).start()
+
+# orjson serializes numeric payloads at native speed and understands numpy dtypes
+app = FastAPI(title="QuantForge Pro", version="2.0.0", default_response_class=ORJSONResponse)
 
 STATIC_DIR = (Path(__file__).parent / "static").resolve()
 STATIC_DIR.mkdir(exist_ok=True)
@@ -34,26 +60,47 @@ app.add_middleware(
 # --- Database Setup (SQLite) ---
 DB_FILE = "quantforge.db"
 
+# One shared autocommit connection in WAL mode: per-request connect/close plus
+# fsync-heavy default-journal commits dominated these sub-ms queries. The lock
+# serializes statement execution on the shared connection.
+_DB_LOCK = threading.Lock()
+
 def init_db():
-    conn = sqlite3.connect(DB_FILE)
+    conn = sqlite3.connect(DB_FILE, check_same_thread=False, isolation_level=None)
+    conn.row_factory = sqlite3.Row
     c = conn.cursor()
     c.execute('''CREATE TABLE IF NOT EXISTS users (username TEXT PRIMARY KEY, password_hash TEXT)''')
-    c.execute('''CREATE TABLE IF NOT EXISTS strategies 
-                 (id INTEGER PRIMARY KEY AUTOINCREMENT, 
-                  username TEXT, name TEXT, ticker TEXT, 
-                  strategy_type TEXT, params TEXT, chat_history TEXT, 
+    c.execute('''CREATE TABLE IF NOT EXISTS strategies
+                 (id INTEGER PRIMARY KEY AUTOINCREMENT,
+                  username TEXT, name TEXT, ticker TEXT,
+                  strategy_type TEXT, params TEXT, chat_history TEXT,
                   created_at TEXT)''')
-    conn.commit()
-    conn.close()
+    c.execute('''CREATE TABLE IF NOT EXISTS price_cache
+                 (key TEXT PRIMARY KEY, ts INTEGER, blob BLOB)''')
+    c.execute('''CREATE TABLE IF NOT EXISTS backtest_cache
+                 (key TEXT PRIMARY KEY, ts INTEGER, blob BLOB)''')
+    c.execute("PRAGMA journal_mode=WAL")
+    c.execute("PRAGMA synchronous=NORMAL")
+    c.execute("PRAGMA temp_store=MEMORY")
+    return conn
 
-init_db()
+_CONN = init_db()
 
 # --- Models ---
-class AuthRequest(BaseModel):
+# frozen: instances are immutable + hashable (usable as cache keys);
+# extra='forbid': skips silently carrying unknown fields through validation
+class _StrictModel(BaseModel):
+    model_config = ConfigDict(frozen=True, extra='forbid', validate_default=False)
+
+class AuthRequest(_StrictModel):
     username: str
     password: str
 
-class SaveStrategyRequest(BaseModel):
+class SaveStrategyRequest(_StrictModel):
+    # The save dialog posts bookkeeping extras (id, created_at, source) on
+    # top of the declared fields; ignore them rather than 422 the save
+    model_config = ConfigDict(extra='ignore')
+
     username: str
     name: str
     ticker: str
@@ -61,7 +108,7 @@ class SaveStrategyRequest(BaseModel):
     params: Dict[str, Any]
     chat_history: List[Any]
 
-class BacktestRequest(BaseModel):
+class BacktestRequest(_StrictModel):
     ticker: str
     startDate: str
     endDate: str
@@ -70,19 +117,19 @@ class BacktestRequest(BaseModel):
     fees: float = 0.001
     slippage: float = 0.001
 
-class CodeGenRequest(BaseModel):
+class CodeGenRequest(_StrictModel):
     ticker: str
     strategy: str
     params: Dict[str, Any]
     fees: float = 0.001
     slippage: float = 0.001
 
-class ScreenerRequest(BaseModel):
+class ScreenerRequest(_StrictModel):
     sector: str 
     strategy: str
     params: Dict[str, Any]
 
-class SignalCheckRequest(BaseModel):
+class SignalCheckRequest(_StrictModel):
     ticker: str
     strategy: str
     params: Dict[str, Any]
@@ -102,16 +149,224 @@ STRESS_SCENARIOS = [
     {"name": "2022 Tech Bear", "start": "2022-01-01", "end": "2022-12-31", "desc": "Rate hike grind"},
 ]
 
+# Scenario dates parsed once at import; the stress-test loop re-parsed these
+# strings on every request before
+_STRESS_SCENARIOS_PARSED = [
+    (s, pd.Timestamp(s["start"]), pd.Timestamp(s["end"]), pd.Timestamp(s["start"]) - pd.Timedelta(days=200))
+    for s in STRESS_SCENARIOS
+]
+
+_SCENARIO_POOL = concurrent.futures.ThreadPoolExecutor(max_workers=len(STRESS_SCENARIOS))
+
+# --- Local Symbol Index (autocomplete) ---
+# 每次按键都打 Yahoo (~100-500ms HTTPS) 太慢。先查本地前缀索引，
+# 命中不足再回退 yahooquery，并把网络结果并进索引，越用越全。
+_SEED_SYMBOLS = [
+    ("NVDA", "NVIDIA Corporation", "EQUITY", "NMS"),
+    ("AMD", "Advanced Micro Devices, Inc.", "EQUITY", "NMS"),
+    ("AAPL", "Apple Inc.", "EQUITY", "NMS"),
+    ("MSFT", "Microsoft Corporation", "EQUITY", "NMS"),
+    ("GOOGL", "Alphabet Inc.", "EQUITY", "NMS"),
+    ("AMZN", "Amazon.com, Inc.", "EQUITY", "NMS"),
+    ("TSLA", "Tesla, Inc.", "EQUITY", "NMS"),
+    ("META", "Meta Platforms, Inc.", "EQUITY", "NMS"),
+    ("NFLX", "Netflix, Inc.", "EQUITY", "NMS"),
+    ("INTC", "Intel Corporation", "EQUITY", "NMS"),
+    ("CRM", "Salesforce, Inc.", "EQUITY", "NYQ"),
+    ("ADBE", "Adobe Inc.", "EQUITY", "NMS"),
+    ("BTC-USD", "Bitcoin USD", "CRYPTOCURRENCY", "CCC"),
+    ("ETH-USD", "Ethereum USD", "CRYPTOCURRENCY", "CCC"),
+    ("SOL-USD", "Solana USD", "CRYPTOCURRENCY", "CCC"),
+    ("BNB-USD", "BNB USD", "CRYPTOCURRENCY", "CCC"),
+    ("XRP-USD", "XRP USD", "CRYPTOCURRENCY", "CCC"),
+    ("DOGE-USD", "Dogecoin USD", "CRYPTOCURRENCY", "CCC"),
+    ("ADA-USD", "Cardano USD", "CRYPTOCURRENCY", "CCC"),
+    ("AVAX-USD", "Avalanche USD", "CRYPTOCURRENCY", "CCC"),
+    ("LINK-USD", "Chainlink USD", "CRYPTOCURRENCY", "CCC"),
+    ("SPY", "SPDR S&P 500 ETF Trust", "ETF", "PCX"),
+    ("QQQ", "Invesco QQQ Trust", "ETF", "NMS"),
+    ("IWM", "iShares Russell 2000 ETF", "ETF", "PCX"),
+    ("TLT", "iShares 20+ Year Treasury Bond ETF", "ETF", "NMS"),
+    ("GLD", "SPDR Gold Shares", "ETF", "PCX"),
+    ("SLV", "iShares Silver Trust", "ETF", "PCX"),
+    ("ARKK", "ARK Innovation ETF", "ETF", "PCX"),
+    ("SMH", "VanEck Semiconductor ETF", "ETF", "NMS"),
+    ("XLE", "Energy Select Sector SPDR Fund", "ETF", "PCX"),
+    ("VXX", "iPath Series B S&P 500 VIX Short-Term Futures ETN", "ETF", "BTS"),
+    ("EEM", "iShares MSCI Emerging Markets ETF", "ETF", "PCX"),
+    ("XLF", "Financial Select Sector SPDR Fund", "ETF", "PCX"),
+    ("BABA", "Alibaba Group Holding Limited", "EQUITY", "NYQ"),
+    ("PDD", "PDD Holdings Inc.", "EQUITY", "NMS"),
+    ("JD", "JD.com, Inc.", "EQUITY", "NMS"),
+    ("BIDU", "Baidu, Inc.", "EQUITY", "NMS"),
+    ("NIO", "NIO Inc.", "EQUITY", "NYQ"),
+    ("LI", "Li Auto Inc.", "EQUITY", "NMS"),
+    ("XPEV", "XPeng Inc.", "EQUITY", "NYQ"),
+    ("TCEHY", "Tencent Holdings Limited", "EQUITY", "PNK"),
+    ("BILI", "Bilibili Inc.", "EQUITY", "NMS"),
+    ("YUMC", "Yum China Holdings, Inc.", "EQUITY", "NYQ"),
+    ("HTHT", "H World Group Limited", "EQUITY", "NMS"),
+]
+
+_SYMBOL_INDEX: Dict[str, dict] = {}
+_SYMBOL_KEYS: List[str] = []  # sorted, for bisect prefix lookup
+
+def _index_symbol(symbol: str, name: str, type_: str, exchange: str):
+    key = symbol.upper()
+    if key in _SYMBOL_INDEX: return
+    _SYMBOL_INDEX[key] = {"symbol": symbol, "name": name, "type": type_, "exchange": exchange}
+    bisect.insort(_SYMBOL_KEYS, key)
+
+for _s in _SEED_SYMBOLS:
+    _index_symbol(*_s)
+
+def _local_search(q: str, limit: int = 20) -> List[dict]:
+    prefix = q.upper()
+    # O(log N) 定位符号前缀区间
+    lo = bisect.bisect_left(_SYMBOL_KEYS, prefix)
+    hi = bisect.bisect_right(_SYMBOL_KEYS, prefix + '￿')
+    matches = [_SYMBOL_INDEX[k] for k in _SYMBOL_KEYS[lo:hi][:limit]]
+    if len(matches) < limit:
+        # 再按公司名单词前缀补充
+        q_low = q.lower()
+        for key in _SYMBOL_KEYS:
+            if len(matches) >= limit: break
+            item = _SYMBOL_INDEX[key]
+            if key.startswith(prefix): continue  # already added
+            if any(w.startswith(q_low) for w in item["name"].lower().split()):
+                matches.append(item)
+    return matches
+
+# --- Price Data Cache ---
+# yfinance round-trips cost 100ms-3s; identical requests within the TTL are
+# served straight from memory (post-processed frame, ready for the engine).
+_HISTORY_CACHE: Dict[tuple, tuple] = {}
+_HISTORY_TTL = 900  # seconds
+_HISTORY_CACHE_MAX = 256
+
+def _evict_history():
+    # Runs on worker threads with no lock: snapshot the items before scanning
+    # so a concurrent insert can't change the dict mid-iteration, and pop with
+    # a default in case another thread already evicted the same key
+    while len(_HISTORY_CACHE) > _HISTORY_CACHE_MAX:
+        items = list(_HISTORY_CACHE.items())
+        if not items:
+            break
+        oldest = min(items, key=lambda kv: kv[1][0])[0]
+        _HISTORY_CACHE.pop(oldest, None)
+
+def _postprocess_history(df: pd.DataFrame) -> pd.DataFrame:
+    if df.empty: return df
+    df = df.reset_index()
+    df.columns = [c.lower() for c in df.columns]
+    if 'date' in df.columns: df['date'] = pd.to_datetime(df['date']).dt.tz_localize(None)
+    # float32 is plenty for daily OHLC and halves memory traffic through the
+    # indicator kernels. Volume stays int64: crypto volumes overflow int32.
+    price_cols = [c for c in ('open', 'high', 'low', 'close') if c in df.columns]
+    if price_cols and df[price_cols].isna().any().any():
+        # Partial-NaN rows (halted sessions, bad ticks) survive yf's dropna
+        # and would permanently poison the running-sum state in the fused
+        # kernels. Carry the last good bar forward and drop anything a ffill
+        # can't reach, so every frame entering the engine is NaN-free.
+        df[price_cols] = df[price_cols].ffill()
+        df = df.dropna(subset=price_cols).reset_index(drop=True)
+    df[price_cols] = df[price_cols].astype(np.float32)
+    return df
+
+def _fetch_history(ticker: str, period: Optional[str] = None, start: Optional[str] = None, end: Optional[str] = None) -> pd.DataFrame:
+    dat = yf.Ticker(ticker)
+    if period:
+        df = dat.history(period=period, auto_adjust=True)
+    else:
+        df = dat.history(start=start, end=end, auto_adjust=True)
+    return _postprocess_history(df)
+
+def _batch_history(tickers: List[str], period: str) -> Dict[str, pd.DataFrame]:
+    """One yf.download round-trip for a whole ticker pool instead of N serial
+    Ticker.history calls; each per-ticker frame lands in the normal cache."""
+    frames: Dict[str, pd.DataFrame] = {}
+    missing = []
+    now = time.time()
+    for t in tickers:
+        hit = _HISTORY_CACHE.get((t, period, None, None))
+        if hit is not None and now - hit[0] < _HISTORY_TTL:
+            frames[t] = hit[1]
+        else:
+            missing.append(t)
+    if not missing:
+        return frames
+    try:
+        big = yf.download(" ".join(missing), period=period, auto_adjust=True,
+                          group_by='ticker', threads=True, progress=False)
+        for t in missing:
+            try:
+                sub = big[t].dropna(how='all')
+            except Exception:
+                continue
+            if sub.empty: continue
+            df = _postprocess_history(sub)
+            frames[t] = df
+            _HISTORY_CACHE[(t, period, None, None)] = (now, df)
+        _evict_history()
+    except Exception as e:
+        log.warning("batch download failed: %s", e)
+    return frames
+
+def _cached_history(ticker: str, period: Optional[str] = None, start: Optional[str] = None, end: Optional[str] = None) -> pd.DataFrame:
+    if start is not None and end is not None:
+        # Quantize the window to month buckets: sliding a date by a few days
+        # then hits the same cache entry instead of triggering a re-download.
+        # Callers slice their exact dates out of the superset afterwards.
+        start = pd.Timestamp(start).to_period('M').start_time.strftime('%Y-%m-%d')
+        end = pd.Timestamp(end).to_period('M').end_time.strftime('%Y-%m-%d')
+    key = (ticker, period, start, end)
+    hit = _HISTORY_CACHE.get(key)
+    now = time.time()
+    if hit is not None and now - hit[0] < _HISTORY_TTL:
+        return hit[1]
+
+    # L2: pickled frame in SQLite, survives restarts and is shared across workers
+    db_key = "|".join(str(p) for p in key)
+    try:
+        with _DB_LOCK:
+            row = _CONN.execute("SELECT ts, blob FROM price_cache WHERE key=?", (db_key,)).fetchone()
+        if row is not None and now - row[0] < _HISTORY_TTL:
+            df = pickle.loads(row[1])
+            _HISTORY_CACHE[key] = (float(row[0]), df)
+            return df
+    except Exception as e:
+        log.warning("price_cache read failed: %s", e)
+
+    df = _fetch_history(ticker, period=period, start=start, end=end)
+    _HISTORY_CACHE[key] = (now, df)
+    _evict_history()
+    if not df.empty:
+        try:
+            with _DB_LOCK:
+                _CONN.execute("INSERT OR REPLACE INTO price_cache VALUES (?, ?, ?)",
+                              (db_key, int(now), pickle.dumps(df, protocol=5)))
+        except Exception as e:
+            log.warning("price_cache write failed: %s", e)
+    return df
+
 # --- Helper Logic ---
-def scan_single_ticker(ticker: str, strategy: str, params: dict):
+def scan_single_ticker(ticker: str, strategy: str, params: dict, df: Optional[pd.DataFrame] = None):
     try:
-        dat = yf.Ticker(ticker)
-        df = dat.history(period="18mo", auto_adjust=True)
+        if df is None:
+            df = _cached_history(ticker, period="18mo")
         if df.empty or len(df) < 100: return None
-        df.reset_index(inplace=True)
-        df.columns = [c.lower() for c in df.columns]
-        if 'date' in df.columns: df['date'] = pd.to_datetime(df['date']).dt.tz_localize(None)
-        
+
+        # Cheap momentum gate before paying for a full engine run: a flat name
+        # with no recent move can't reach BUY SIGNAL / UPTREND / >10% return.
+        # Sharp 5-bar dips pass too so mean-reversion strategies keep their
+        # candidates.
+        close = df['close']
+        look = min(len(close) - 1, 252)
+        quick_ret = (close.iat[-1] / close.iat[-1 - look] - 1) * 100
+        mom5 = close.iat[-1] / close.iat[-6] - 1
+        if quick_ret <= 5 and abs(mom5) <= 0.02:
+            return None
+
         engine = SakuraEngine(df)
         res = engine.run_strategy(strategy, params, capital=10000)
         
@@ -136,7 +391,7 @@ def scan_single_ticker(ticker: str, strategy: str, params: dict):
         elif is_uptrend: status_label = "UPTREND"
         
         return {
-            "symbol": ticker, "price": df.iloc[-1]['close'], "status": status_label,
+            "symbol": ticker, "price": df['close'].iat[-1], "status": status_label,
             "yearlyReturn": yearly_return, "winRate": res['metrics']['winRate']
         }
     except: return None
@@ -145,121 +400,124 @@ def scan_single_ticker(ticker: str, strategy: str, params: dict):
 
 @app.post("/api/auth/register")
 def register(req: AuthRequest):
-    conn = sqlite3.connect(DB_FILE)
-    c = conn.cursor()
     try:
-        pw_hash = hashlib.sha256(req.password.encode()).hexdigest()
-        c.execute("INSERT INTO users VALUES (?, ?)", (req.username, pw_hash))
-        conn.commit()
+        pw_hash = hashlib.sha256(req.password.encode()).digest().hex()
+        with _DB_LOCK:
+            _CONN.execute("INSERT INTO users VALUES (?, ?)", (req.username, pw_hash))
         return {"status": "ok", "username": req.username}
     except sqlite3.IntegrityError:
         raise HTTPException(status_code=400, detail="Username already exists")
-    finally: conn.close()
 
 @app.post("/api/auth/login")
 def login(req: AuthRequest):
-    conn = sqlite3.connect(DB_FILE)
-    c = conn.cursor()
-    pw_hash = hashlib.sha256(req.password.encode()).hexdigest()
-    c.execute("SELECT username FROM users WHERE username=? AND password_hash=?", (req.username, pw_hash))
-    user = c.fetchone()
-    conn.close()
-    if user: return {"status": "ok", "username": user[0]}
+    pw_hash = hashlib.sha256(req.password.encode()).digest().hex()
+    with _DB_LOCK:
+        row = _CONN.execute("SELECT password_hash FROM users WHERE username=?", (req.username,)).fetchone()
+    # Primary-key point lookup + constant-time digest comparison on our side,
+    # so the match can't be timed through the SQL string compare
+    if row is not None and hmac.compare_digest(row[0], pw_hash):
+        return {"status": "ok", "username": req.username}
     raise HTTPException(status_code=401, detail="Invalid credentials")
 
 @app.post("/api/library/save")
 def save_strategy(req: SaveStrategyRequest):
-    conn = sqlite3.connect(DB_FILE)
-    c = conn.cursor()
     # Ensure params/history are strings
     p_str = json.dumps(req.params)
     c_str = json.dumps(req.chat_history)
-    c.execute("INSERT INTO strategies (username, name, ticker, strategy_type, params, chat_history, created_at) VALUES (?, ?, ?, ?, ?, ?, ?)",
-              (req.username, req.name, req.ticker, req.strategy_type, p_str, c_str, datetime.now().strftime("%Y-%m-%d %H:%M")))
-    conn.commit()
-    conn.close()
+    with _DB_LOCK:
+        _CONN.execute("INSERT INTO strategies (username, name, ticker, strategy_type, params, chat_history, created_at) VALUES (?, ?, ?, ?, ?, ?, ?)",
+                      (req.username, req.name, req.ticker, req.strategy_type, p_str, c_str, datetime.now().strftime("%Y-%m-%d %H:%M")))
     return {"status": "ok"}
 
 @app.get("/api/library/list")
 def list_strategies(username: str):
-    conn = sqlite3.connect(DB_FILE)
-    conn.row_factory = sqlite3.Row
-    c = conn.cursor()
-    c.execute("SELECT * FROM strategies WHERE username=? ORDER BY id DESC", (username,))
-    rows = c.fetchall()
-    conn.close()
+    with _DB_LOCK:
+        rows = _CONN.execute("SELECT * FROM strategies WHERE username=? ORDER BY id DESC", (username,)).fetchall()
     return [dict(row) for row in rows]
 
 @app.delete("/api/library/delete/{id}")
 def delete_strategy(id: int):
-    conn = sqlite3.connect(DB_FILE)
-    c = conn.cursor()
-    c.execute("DELETE FROM strategies WHERE id=?", (id,))
-    conn.commit()
-    conn.close()
+    with _DB_LOCK:
+        _CONN.execute("DELETE FROM strategies WHERE id=?", (id,))
     return {"status": "ok"}
 
 # --- V1 Analysis Endpoints ---
 
 @app.post("/v1/check-signal", tags=["alerts"])
-def check_signal(req: SignalCheckRequest):
+async def check_signal(req: SignalCheckRequest):
     try:
-        dat = yf.Ticker(req.ticker)
-        df = dat.history(period="6mo", auto_adjust=True)
+        df = await asyncio.to_thread(_cached_history, req.ticker, "6mo")
         if df.empty: return {"status": "ERROR", "message": "No data"}
-        df.reset_index(inplace=True)
-        df.columns = [c.lower() for c in df.columns]
-        if 'date' in df.columns: df['date'] = pd.to_datetime(df['date']).dt.tz_localize(None)
-        
+
         engine = SakuraEngine(df)
-        res = engine.run_strategy(req.strategy, req.params, capital=10000)
-        
-        last_date = df.iloc[-1]['date'].strftime('%Y-%m-%d')
-        last_price = df.iloc[-1]['close']
+        res = await asyncio.to_thread(engine.run_strategy, req.strategy, req.params, 10000)
+
+        last_date = df['date'].iat[-1].strftime('%Y-%m-%d')
+        last_price = df['close'].iat[-1]
         entries = res['entries']
         exits = res['exits']
         
         signal = "NEUTRAL"
         if entries.iloc[-2:].any(): signal = "BUY"
         elif exits.iloc[-2:].any(): signal = "SELL"
-            
-        return { "ticker": req.ticker, "date": last_date, "price": last_price, "signal": signal }
+
+        # Explicit ORJSONResponse: price is a numpy scalar (float32 after the
+        # dtype downcast) which jsonable_encoder can't handle but orjson can
+        return ORJSONResponse({ "ticker": req.ticker, "date": last_date, "price": last_price, "signal": signal })
     except Exception as e: return {"status": "ERROR", "message": str(e)}
 
 @app.post("/v1/screener", tags=["screener"])
-def run_screener(req: ScreenerRequest):
+async def run_screener(req: ScreenerRequest):
     tickers = SECTOR_POOLS.get(req.sector, [])
-    results = []
+    # One batched download up front; workers then only do CPU work
+    # (any ticker the batch missed falls back to a per-ticker fetch)
+    frames = await asyncio.to_thread(_batch_history, tickers, "18mo")
+    loop = asyncio.get_running_loop()
     with concurrent.futures.ThreadPoolExecutor(max_workers=8) as executor:
-        futures = [executor.submit(scan_single_ticker, t, req.strategy, req.params) for t in tickers]
-        for future in concurrent.futures.as_completed(futures):
-            res = future.result()
-            if res: results.append(res)
+        scans = await asyncio.gather(*[
+            loop.run_in_executor(executor, scan_single_ticker, t, req.strategy, req.params, frames.get(t))
+            for t in tickers
+        ])
+    results = [r for r in scans if r]
     results.sort(key=lambda x: x['yearlyReturn'], reverse=True)
     state_rank = {"BUY SIGNAL": 2, "UPTREND": 1, "NEUTRAL": 0}
     results.sort(key=lambda x: state_rank.get(x['status'], 0), reverse=True)
-    return results
+    return ORJSONResponse(results)
 
 @app.get("/v1/search")
-def search_ticker(q: str = Query(..., min_length=1)):
-    from yahooquery import search
+async def search_ticker(q: str = Query(..., min_length=1)):
+    # Hot path: in-process prefix lookup, no network
+    local = _local_search(q)
+    if len(local) >= 3:
+        return local
+
+    # Miss / thin result -> fall back to Yahoo and feed the index
+    if _yq_search is None:
+        return local
     try:
-        response = search(q)
-        quotes = response.get('quotes', [])
-        if not quotes: return []
-        results = []
-        for item in quotes:
-            if 'symbol' not in item: continue
-            results.append({
-                "symbol": item['symbol'],
-                "name": item.get('shortname') or item.get('longname') or item.get('name', 'Unknown'),
-                "type": item.get('quoteType', 'Unknown'),
-                "exchange": item.get('exchange', 'Unknown')
-            })
-        return results
+        results = await asyncio.to_thread(_remote_search, q.lower())
+        return list(results) if results else local
     except Exception as e:
-        print(f"Search error: {e}")
-        return []
+        log.warning("Search error: %s", e)
+        return local
+
+@functools.lru_cache(maxsize=512)
+def _remote_search(q: str) -> tuple:
+    # Autocomplete queries repeat heavily ("A", "AA", "AAP", ...); memoize the
+    # Yahoo round-trip per normalized query. Errors propagate and stay uncached.
+    response = _yq_search(q)
+    results = []
+    for item in response.get('quotes', []):
+        if 'symbol' not in item: continue
+        entry = {
+            "symbol": item['symbol'],
+            "name": item.get('shortname') or item.get('longname') or item.get('name', 'Unknown'),
+            "type": item.get('quoteType', 'Unknown'),
+            "exchange": item.get('exchange', 'Unknown')
+        }
+        results.append(entry)
+        _index_symbol(entry['symbol'], entry['name'], entry['type'], entry['exchange'])
+    return tuple(results)
 
 @app.post("/v1/code-gen", tags=["code"])
 def generate_code(req: CodeGenRequest):
@@ -269,8 +527,64 @@ def generate_code(req: CodeGenRequest):
         "backtrader": generate_backtrader_code(req.ticker, req.strategy, req.params, req.fees, req.slippage)
     }
 
+# Backtests are deterministic in their request body, so identical re-submits
+# (re-renders, param dialog toggles) can be answered without re-running anything
+_BACKTEST_CACHE: Dict[str, tuple] = {}
+_BACKTEST_TTL = 300  # seconds
+_BACKTEST_CACHE_MAX = 64
+# L2 on disk, same shape as price_cache: survives restarts, and with daily
+# bars a day of staleness is at most one missing candle
+_BACKTEST_L2_TTL = 86400  # seconds
+
+def _sweep_expired_cache_rows():
+    """Delete expired price_cache / backtest_cache rows at startup. The read
+    paths only skip stale rows, so without a sweep the tables grow by one row
+    per distinct key per day forever."""
+    now = int(time.time())
+    try:
+        with _DB_LOCK:
+            _CONN.execute("DELETE FROM price_cache WHERE ts < ?", (now - _HISTORY_TTL,))
+            _CONN.execute("DELETE FROM backtest_cache WHERE ts < ?", (now - _BACKTEST_L2_TTL,))
+    except Exception as e:
+        log.warning("cache sweep failed: %s", e)
+
+_sweep_expired_cache_rows()
+
+def _backtest_etag(req: BacktestRequest) -> str:
+    body = json.dumps(req.model_dump(), sort_keys=True).encode()
+    return hashlib.blake2b(body, digest_size=16).hexdigest()
+
+def _backtest_l2_get(etag: str):
+    try:
+        with _DB_LOCK:
+            row = _CONN.execute("SELECT ts, blob FROM backtest_cache WHERE key=?", (etag,)).fetchone()
+        if row and time.time() - row['ts'] < _BACKTEST_L2_TTL:
+            return pickle.loads(row['blob'])
+    except Exception as e:
+        log.warning("backtest L2 read failed: %s", e)
+    return None
+
+def _backtest_l2_put(etag: str, payload: dict):
+    try:
+        blob = pickle.dumps(payload, protocol=5)
+        with _DB_LOCK:
+            _CONN.execute("INSERT OR REPLACE INTO backtest_cache (key, ts, blob) VALUES (?, ?, ?)",
+                          (etag, int(time.time()), blob))
+    except Exception as e:
+        log.warning("backtest L2 write failed: %s", e)
+
 @app.post("/v1/run-backtest", tags=["backtest"])
-def run_backtest(req: BacktestRequest):
+async def run_backtest(req: BacktestRequest, request: Request):
+    etag = _backtest_etag(req)
+    if request.headers.get("if-none-match") == etag:
+        return Response(status_code=304)
+    hit = _BACKTEST_CACHE.get(etag)
+    if hit is not None and time.time() - hit[0] < _BACKTEST_TTL:
+        return ORJSONResponse(hit[1], headers={"ETag": etag, "Cache-Control": "private, max-age=60"})
+    l2 = await asyncio.to_thread(_backtest_l2_get, etag)
+    if l2 is not None:
+        _BACKTEST_CACHE[etag] = (time.time(), l2)
+        return ORJSONResponse(l2, headers={"ETag": etag, "Cache-Control": "private, max-age=60"})
     try:
         today = datetime.now()
         req_start = pd.to_datetime(req.startDate)
@@ -279,19 +593,21 @@ def run_backtest(req: BacktestRequest):
         if req_start >= req_end: raise HTTPException(status_code=400, detail="Invalid date range.")
         buffer_start = req_start - pd.Timedelta(days=365)
         
-        dat = yf.Ticker(req.ticker)
-        df = dat.history(start=buffer_start.strftime('%Y-%m-%d'), end=req_end.strftime('%Y-%m-%d'), auto_adjust=True)
+        df = await asyncio.to_thread(_cached_history, req.ticker, None, buffer_start.strftime('%Y-%m-%d'), req_end.strftime('%Y-%m-%d'))
         if df.empty: raise HTTPException(status_code=404, detail="No data found.")
-        df.reset_index(inplace=True)
-        df.columns = [c.lower() for c in df.columns]
-        if 'date' in df.columns: df['date'] = pd.to_datetime(df['date']).dt.tz_localize(None)
-        
-        user_view_mask = (df['date'] >= req_start) & (df['date'] <= req_end)
-        if df.loc[user_view_mask].empty: raise HTTPException(status_code=404, detail="Empty data range.")
+
+        # dates are sorted, so the visible window is an O(log N) binary search
+        # instead of two full-array compares plus a boolean gather
+        dates = df['date'].to_numpy()
+        lo = int(np.searchsorted(dates, req_start.to_datetime64(), side='left'))
+        hi = int(np.searchsorted(dates, req_end.to_datetime64(), side='right'))
+        if lo >= hi: raise HTTPException(status_code=404, detail="Empty data range.")
 
         engine = SakuraEngine(df)
-        # Pass the user's requested window so metrics & trades are computed strictly within it
-        result = engine.run_strategy(
+        # Pass the user's requested window so metrics & trades are computed strictly within it.
+        # The engine run is CPU-bound, so push it off the event loop too.
+        result = await asyncio.to_thread(
+            engine.run_strategy,
             req.strategy,
             req.params,
             capital=req.params.get('initialCapital', 10000),
@@ -301,70 +617,103 @@ def run_backtest(req: BacktestRequest):
             metrics_end=req_end
         )
         
-        mask = (df['date'] >= req_start) & (df['date'] <= req_end)
-        filtered_df = df.loc[mask].copy()
-        
+        filtered_df = df.iloc[lo:hi]  # view is fine, read-only downstream
+
         indicators = result['indicators']
-        entries = result['entries'] 
-        exits = result['exits']    
-        
-        resp_data = []
-        for i, row in filtered_df.iterrows():
-            current_date = row['date']
-            item = { "date": current_date.strftime('%Y-%m-%d'), "open": float(row['open']), "high": float(row['high']), "low": float(row['low']), "close": float(row['close']), "volume": int(row['volume']) }
-            for key, series in indicators.items():
-                if current_date in series.index:
-                    val = series.loc[current_date]
-                    if pd.notnull(val): item[key] = float(val)
-            if current_date in entries.index and entries.loc[current_date]: item['buySignal'] = float(row['low'] * 0.98)
-            if current_date in exits.index and exits.loc[current_date]: item['sellSignal'] = float(row['high'] * 1.02)
-            resp_data.append(item)
-
-        return { "data": resp_data, "trades": result['trades'], "metrics": result['metrics'] }
+        entries = result['entries']
+        exits = result['exits']
+
+        # Vectorized response assembly: align every Series to the visible window once
+        # instead of doing per-row .loc lookups (O(N*K) hash probes -> K reindexes)
+        idx = pd.DatetimeIndex(filtered_df['date'])
+        # Every engine Series shares one DatetimeIndex, so resolve the
+        # positional map once and join each column with np.take instead of
+        # running a separate hash-join reindex per indicator
+        pos = entries.index.get_indexer(idx)
+        valid = pos >= 0
+        safe_pos = np.where(valid, pos, 0)
+        entries_arr = entries.to_numpy()[safe_pos] & valid
+        exits_arr = exits.to_numpy()[safe_pos] & valid
+
+        # Gather every column first, then build the wide frame in a single
+        # allocation instead of inserting columns one by one into a copy
+        # datetime_as_string formats the whole index in one C call; strftime
+        # round-trips every element through a Python datetime
+        cols = {'date': np.datetime_as_string(idx.to_numpy().astype('datetime64[D]'), unit='D')}
+        for name in ('open', 'high', 'low', 'close', 'volume'):
+            cols[name] = filtered_df[name].to_numpy()
+        for key, series in indicators.items():
+            cols[key] = np.where(valid, series.to_numpy()[safe_pos], np.nan)
+        cols['buySignal'] = np.where(entries_arr, cols['low'] * 0.98, np.nan)
+        cols['sellSignal'] = np.where(exits_arr, cols['high'] * 1.02, np.nan)
+
+        # Columnar (SoA) wire format: the ndarrays go straight to orjson,
+        # which emits NaN as null. No per-row dicts server-side — the client
+        # zips columns back into rows when rendering, skipping null gaps.
+        cols['date'] = cols['date'].tolist()
+        resp_data = cols
+
+        # Return the response directly so numpy scalars go straight to orjson
+        # (bypasses jsonable_encoder, which would choke on np.int64)
+        payload = { "data": resp_data, "trades": result['trades'], "metrics": result['metrics'] }
+        _BACKTEST_CACHE[etag] = (time.time(), payload)
+        if len(_BACKTEST_CACHE) > _BACKTEST_CACHE_MAX:
+            oldest = min(_BACKTEST_CACHE, key=lambda k: _BACKTEST_CACHE[k][0])
+            del _BACKTEST_CACHE[oldest]
+        await asyncio.to_thread(_backtest_l2_put, etag, payload)
+        return ORJSONResponse(payload, headers={"ETag": etag, "Cache-Control": "private, max-age=60"})
     except Exception as e:
-        print(e)
+        log.error("run_backtest failed: %s", e)
         raise HTTPException(status_code=500, detail=str(e))
 
+def _run_one_scenario(scenario: dict, scen_start: pd.Timestamp, scen_end: pd.Timestamp, buffer_start: pd.Timestamp,
+                      indexed_df: pd.DataFrame, dates: np.ndarray, req: BacktestRequest):
+    lo = int(np.searchsorted(dates, buffer_start.to_datetime64(), side='left'))
+    hi = int(np.searchsorted(dates, scen_end.to_datetime64(), side='right'))
+    scen_df = indexed_df.iloc[lo:hi]
+
+    if len(scen_df) < 50:
+        return { **scenario, "status": "N/A", "reason": "IPO later" }
+
+    try:
+        engine = SakuraEngine(scen_df, already_indexed=True)
+        res = engine.run_strategy(req.strategy, req.params, capital=10000, fees=req.fees, slippage=req.slippage)
+        real_lo = int(np.searchsorted(dates[lo:hi], scen_start.to_datetime64(), side='left'))
+        real_df = scen_df.iloc[real_lo:]
+        benchmark = 0.0
+        if not real_df.empty:
+            start_p = real_df['open'].iat[0]
+            end_p = real_df['close'].iat[-1]
+            benchmark = ((end_p - start_p) / start_p) * 100
+        return {
+            **scenario, "status": "OK", "return": res['metrics']['totalReturn'], "maxDrawdown": res['metrics']['maxDrawdown'], "benchmark": benchmark
+        }
+    except:
+        return { **scenario, "status": "Error" }
+
 @app.post("/v1/run-stress-test", tags=["backtest"])
-def run_stress_test(req: BacktestRequest):
-    results = []
+async def run_stress_test(req: BacktestRequest):
     try:
-        full_dat = yf.Ticker(req.ticker)
-        full_df = full_dat.history(start="1999-01-01", end=datetime.now().strftime('%Y-%m-%d'), auto_adjust=True)
+        # Key is stable within a day, so repeated stress tests hit the cache
+        full_df = await asyncio.to_thread(_cached_history, req.ticker, None, "1999-01-01", datetime.now().strftime('%Y-%m-%d'))
         if full_df.empty: return []
-        full_df.reset_index(inplace=True)
-        full_df.columns = [c.lower() for c in full_df.columns]
-        if 'date' in full_df.columns: full_df['date'] = pd.to_datetime(full_df['date']).dt.tz_localize(None)
     except: return []
 
-    for scenario in STRESS_SCENARIOS:
-        scen_start = pd.to_datetime(scenario["start"])
-        scen_end = pd.to_datetime(scenario["end"])
-        buffer_start = scen_start - pd.Timedelta(days=200)
-        
-        mask = (full_df['date'] >= buffer_start) & (full_df['date'] <= scen_end)
-        scen_df = full_df.loc[mask].copy()
-        
-        if len(scen_df) < 50: 
-            results.append({ **scenario, "status": "N/A", "reason": "IPO later" })
-            continue
-
-        try:
-            engine = SakuraEngine(scen_df)
-            res = engine.run_strategy(req.strategy, req.params, capital=10000, fees=req.fees, slippage=req.slippage)
-            real_mask = (scen_df['date'] >= scen_start)
-            real_df = scen_df.loc[real_mask]
-            benchmark = 0.0
-            if not real_df.empty:
-                start_p = real_df.iloc[0]['open']
-                end_p = real_df.iloc[-1]['close']
-                benchmark = ((end_p - start_p) / start_p) * 100
-            results.append({
-                **scenario, "status": "OK", "return": res['metrics']['totalReturn'], "maxDrawdown": res['metrics']['maxDrawdown'], "benchmark": benchmark
-            })
-        except:
-            results.append({ **scenario, "status": "Error" })
-    return results
+    # Scenarios are independent -> run them concurrently; gather preserves order.
+    # Workers are threads, so full_df and the date array are shared zero-copy;
+    # each worker only takes an iloc view of its own window. A dedicated pool
+    # (same pattern as the screener) keeps the four scenario threads from
+    # queueing behind unrelated to_thread work on the default executor.
+    dates = full_df['date'].to_numpy()
+    # Index by date once per request (shallow, shares the column buffers);
+    # every scenario engine then takes a no-copy view
+    indexed_df = full_df.set_index('date')
+    loop = asyncio.get_running_loop()
+    results = await asyncio.gather(*[
+        loop.run_in_executor(_SCENARIO_POOL, _run_one_scenario, scenario, scen_start, scen_end, buffer_start, indexed_df, dates, req)
+        for scenario, scen_start, scen_end, buffer_start in _STRESS_SCENARIOS_PARSED
+    ])
+    return ORJSONResponse(list(results))
 
 if __name__ == "__main__":
     uvicorn.run("main:app", host="127.0.0.1", port=8000, reload=True)
\ No newline at end of file
@@ -1,178 +1,326 @@
+import concurrent.futures
+import hashlib
+import logging
+import os
+import threading
+
 import vectorbt as vbt
 import pandas as pd
 import numpy as np
+from numpy.lib.stride_tricks import sliding_window_view
 from typing import Optional
 
+import engine_kernels as K
+
+log = logging.getLogger("quantforge.engine")
+
+# Signal memoization across engine instances: UI parameter sweeps re-hit the
+# endpoints with identical (data, strategy, params) and the signal block is
+# deterministic in them. Keyed by a hash of the close array, so a fresh fetch
+# of the same ticker with new bars misses naturally.
+_SIGNAL_CACHE: dict = {}
+_SIGNAL_CACHE_MAX = 256
+# Serializes insert+evict: run_strategy runs concurrently on the stress and
+# grid thread pools, and two unguarded evictions can race into a KeyError
+_SIGNAL_LOCK = threading.Lock()
+
+def _rolling_mean_np(x: np.ndarray, w: int) -> np.ndarray:
+    """Fixed-window rolling mean via convolution - one C call instead of
+    pandas' variable-window machinery. NaNs contaminate exactly the windows
+    that contain them, matching rolling(w).mean() with default min_periods."""
+    out = np.full(x.size, np.nan)
+    if w > 0 and x.size >= w:
+        out[w - 1:] = np.convolve(x, np.ones(w) / w, mode='valid')
+    return out
+
+def _fshift1(b: np.ndarray) -> np.ndarray:
+    """Shift a boolean signal array one bar forward (bar 0 becomes False)."""
+    out = np.empty_like(b)
+    out[0] = False
+    out[1:] = b[:-1]
+    return out
+
 class SakuraEngine:
-    def __init__(self, data: pd.DataFrame):
-        self.data = data.copy()
-        if 'date' in self.data.columns:
-            self.data['date'] = pd.to_datetime(self.data['date'])
-            self.data.set_index('date', inplace=True)
-            
-        self.data.sort_index(inplace=True)
-        
+    def __init__(self, data: pd.DataFrame, already_indexed: bool = False):
+        if already_indexed:
+            # Caller guarantees a sorted DatetimeIndex and read-only use:
+            # skip the full-frame copy (matters when 4+ engines slice the
+            # same cached history per request)
+            self.data = data
+        else:
+            self.data = data.copy()
+            if 'date' in self.data.columns:
+                self.data['date'] = pd.to_datetime(self.data['date'])
+                self.data.set_index('date', inplace=True)
+
+            self.data.sort_index(inplace=True)
+
         self.close = self.data['close']
         self.open = self.data['open']
         self.high = self.data['high']
         self.low = self.data['low']
         self.volume = self.data['volume']
 
+        # Raw arrays for the kernels, resolved once per engine instead of a
+        # to_numpy() per strategy run (the screener builds 12+ engines per
+        # call). Contiguous float64: fetched frames carry float32 columns to
+        # keep the cache small, but promoting once here means every kernel
+        # compiles a single f8 specialization and skips per-call dtype checks.
+        self.index = self.data.index
+        self.close_a = np.ascontiguousarray(self.close.to_numpy(), dtype=np.float64)
+        self.open_a = np.ascontiguousarray(self.open.to_numpy(), dtype=np.float64)
+        self.high_a = np.ascontiguousarray(self.high.to_numpy(), dtype=np.float64)
+        self.low_a = np.ascontiguousarray(self.low.to_numpy(), dtype=np.float64)
+        self._data_hash = hashlib.blake2b(self.close_a.tobytes(), digest_size=8).hexdigest()
+
+        # Indicator memo for this instrument: grid sweeps and multi-strategy
+        # runs on one engine re-request the same MA/ADX (data is immutable for
+        # the life of the instance, so entries never go stale)
+        self._ind_cache: dict = {}
+
+    def _ma(self, window: int, ewm: bool = False) -> pd.Series:
+        key = ('ma', window, ewm)
+        hit = self._ind_cache.get(key)
+        if hit is None:
+            if ewm:
+                hit = self.close.ewm(span=window, adjust=False).mean()
+            else:
+                hit = self.close.rolling(window).mean()
+            self._ind_cache[key] = hit
+        return hit
+
     def _calculate_adx(self, period=14):
-        """Helper to calculate ADX using pandas only"""
-        plus_dm = self.high.diff()
-        minus_dm = self.low.diff()
-        plus_dm[plus_dm < 0] = 0
-        minus_dm[minus_dm > 0] = 0
-        
-        tr1 = pd.DataFrame(self.high - self.low)
-        tr2 = pd.DataFrame(abs(self.high - self.close.shift(1)))
-        tr3 = pd.DataFrame(abs(self.low - self.close.shift(1)))
-        tr = pd.concat([tr1, tr2, tr3], axis=1).max(axis=1)
-        
-        atr = tr.rolling(period).mean()
+        """ADX via the fused numba kernel; pandas pipeline kept as the
+        fallback when numba is unavailable (the no-op njit shim would make
+        the kernel's Python loop slower than pandas)."""
+        cached = self._ind_cache.get(('adx', period))
+        if cached is not None:
+            return cached
+        if K.NUMBA_AVAILABLE:
+            adx = pd.Series(K.adx_wilder(self.high_a, self.low_a, self.close_a, period), index=self.index)
+            self._ind_cache[('adx', period)] = adx
+            return adx
+
+        # No numba: try the optional TA-Lib binding before paying for pandas
+        ta = K.adx_talib(self.high_a, self.low_a, self.close_a, period)
+        if ta is not None:
+            adx = pd.Series(ta, index=self.index)
+            self._ind_cache[('adx', period)] = adx
+            return adx
+
+        # Branchless directional moves: np.maximum on the raw arrays instead
+        # of masked Series assignment (no mask allocation, no scatter). Bar 0
+        # stays NaN exactly like .diff() produced, and -DM carries its
+        # magnitude directly so no abs() pass is needed downstream.
+        h, l = self.high_a, self.low_a
+        pdm = np.full(h.size, np.nan)
+        mdm = np.full(l.size, np.nan)
+        pdm[1:] = np.maximum(h[1:] - h[:-1], 0.0)
+        mdm[1:] = np.maximum(l[:-1] - l[1:], 0.0)
+        plus_dm = pd.Series(pdm, index=self.index)
+        minus_dm = pd.Series(mdm, index=self.index)
+
+
+        # True range as one np.maximum chain; the old concat of three
+        # single-column DataFrames plus an axis-1 max spent its time on
+        # pandas construction, not arithmetic. Bar 0 falls back to high-low,
+        # same as the skipna row-max did.
+        pc = np.empty_like(h)
+        pc[0] = np.nan
+        pc[1:] = self.close_a[:-1]
+        tr_a = np.maximum(np.maximum(h - l, np.abs(h - pc)), np.abs(l - pc))
+        tr_a[0] = h[0] - l[0]
+
+        atr = pd.Series(_rolling_mean_np(tr_a, period), index=self.index)
         
         plus_di = 100 * (plus_dm.ewm(alpha=1/period).mean() / atr)
-        minus_di = 100 * (abs(minus_dm).ewm(alpha=1/period).mean() / atr)
+        minus_di = 100 * (minus_dm.ewm(alpha=1/period).mean() / atr)
         
         dx = (abs(plus_di - minus_di) / abs(plus_di + minus_di)) * 100
-        adx = dx.rolling(period).mean()
+        adx = pd.Series(_rolling_mean_np(dx.to_numpy(), period), index=self.index)
+        self._ind_cache[('adx', period)] = adx
         return adx
 
+    def _series(self, arr) -> pd.Series:
+        # Kernels work on raw arrays; wrap back into Series only at the
+        # boundary so downstream code keeps its DatetimeIndex
+        return pd.Series(arr, index=self.index)
+
+    # --- Strategy handlers ---
+    # One function per strategy, dispatched through _STRATS below. Each one
+    # coerces its params exactly once and returns (entries, exits, indicators).
+
+    # --- 1. 基础策略 (Trend & Mean Reversion) ---
+    def _strat_sma_crossover(self, params: dict):
+        e, x, fast, slow = K.sma_cross(self.close_a, int(params.get('shortWindow', 20)),
+                                       int(params.get('longWindow', 50)))
+        return self._series(e), self._series(x), {'smaShort': self._series(fast),
+                                                  'smaLong': self._series(slow)}
+
+    def _strat_ema_crossover(self, params: dict):
+        e, x, fast, slow = K.ema_cross(self.close_a, int(params.get('shortWindow', 20)),
+                                       int(params.get('longWindow', 50)))
+        return self._series(e), self._series(x), {'emaShort': self._series(fast),
+                                                  'emaLong': self._series(slow)}
+
+    def _strat_rsi_reversal(self, params: dict):
+        e, x, rsi = K.rsi_cross(self.close_a, int(params.get('rsiPeriod', 14)),
+                                float(params.get('rsiOversold', 30)),
+                                float(params.get('rsiOverbought', 70)))
+        return self._series(e), self._series(x), {'rsi': self._series(rsi)}
+
+    def _strat_bollinger(self, params: dict):
+        e, x, upper, lower = K.bbands_break(self.close_a, int(params.get('bbPeriod', 20)),
+                                            float(params.get('bbStdDev', 2.0)))
+        return self._series(e), self._series(x), {'upperBand': self._series(upper),
+                                                  'lowerBand': self._series(lower)}
+
+    def _strat_macd(self, params: dict):
+        e, x, macd, signal, hist = K.macd_cross(self.close_a, int(params.get('macdFast', 12)),
+                                                int(params.get('macdSlow', 26)),
+                                                int(params.get('macdSignal', 9)))
+        return self._series(e), self._series(x), {'macd': self._series(macd),
+                                                  'macdSignal': self._series(signal),
+                                                  'macdHist': self._series(hist)}
+
+    def _strat_momentum(self, params: dict):
+        e, x, roc = K.roc_zero(self.close_a, int(params.get('rocPeriod', 12)))
+        return self._series(e), self._series(x), {'roc': self._series(roc)}
+
+    # --- 2. 进阶策略 (Advanced Filters & Breakouts) ---
+    # A. 双重确认 (Trend + RSI)
+    def _strat_trend_rsi(self, params: dict):
+        ma = self._ma(int(params.get('trendMa', 200)))
+        rsi_e, rsi_x, rsi = K.rsi_cross(self.close_a, int(params.get('rsiPeriod', 14)),
+                                        float(params.get('rsiOversold', 30)), 70.0)
+        # 只有在大趋势向上时，才允许抄底
+        entries = (self.close > ma) & self._series(rsi_e)
+        exits = self._series(rsi_x) | (self.close < ma)  # 止盈或趋势破位止损
+        return entries, exits, {'smaLong': ma, 'rsi': self._series(rsi)}
+
+    # B. 波动率过滤 (Volatility Filter)
+    def _strat_volatility_filter(self, params: dict):
+        adx_threshold = int(params.get('adxThreshold', 25))
+        # 基础均线信号
+        base_e, base_x, fast_ma, slow_ma = K.sma_cross(self.close_a, 10, 50)
+
+        # ADX 计算
+        adx = self._calculate_adx(int(params.get('adxPeriod', 14)))
+        is_trending = adx > adx_threshold
+
+        # 过滤信号：只有在趋势强劲时才开仓
+        entries = self._series(base_e) & is_trending
+        exits = self._series(base_x)  # 出场通常不需要过滤，或者也可以强制止损
+        # 前端目前还没画 ADX 的图，暂不传 adx
+        return entries, exits, {'smaShort': self._series(fast_ma),
+                                'smaLong': self._series(slow_ma)}
+
+    # C. 海龟法则 (Turtle / Donchian)
+    def _strat_turtle(self, params: dict):
+        entry_window = int(params.get('turtleEntry', 20))
+        exit_window = int(params.get('turtleExit', 10))
+
+        # Donchian Channel: fixed-window extrema over a strided view;
+        # pandas rolling max/min pays for variable-window generality
+        # it doesn't need here. Offset by one row = the .shift(1).
+        n = self.close_a.size
+        high_n = np.full(n, np.nan)
+        if n > entry_window:
+            high_n[entry_window:] = sliding_window_view(self.high_a, entry_window)[:-1].max(axis=1)
+        low_n = np.full(n, np.nan)
+        if n > exit_window:
+            low_n[exit_window:] = sliding_window_view(self.low_a, exit_window)[:-1].min(axis=1)
+
+        return (self._series(self.close_a > high_n), self._series(self.close_a < low_n),
+                {'upperBand': self._series(high_n), 'lowerBand': self._series(low_n)})
+
+    # D. 肯特纳通道 (Keltner Channels)
+    def _strat_keltner(self, params: dict):
+        # 单次扫描的融合 kernel (EMA + Wilder ATR + 信号)
+        # 突破上轨买入, 跌破中轨卖出保护利润
+        e, x, upper, lower, middle = K.keltner(self.high_a, self.low_a, self.close_a,
+                                               int(params.get('keltnerPeriod', 20)), 10,
+                                               float(params.get('keltnerMult', 2.0)))
+        return self._series(e), self._series(x), {'upperBand': self._series(upper),
+                                                  'lowerBand': self._series(lower),
+                                                  'emaShort': self._series(middle)}
+
+    _STRATS = {
+        "SMA_CROSSOVER": _strat_sma_crossover,
+        "EMA_CROSSOVER": _strat_ema_crossover,
+        "RSI_REVERSAL": _strat_rsi_reversal,
+        "BOLLINGER_BANDS": _strat_bollinger,
+        "MACD": _strat_macd,
+        "MOMENTUM": _strat_momentum,
+        "TREND_RSI": _strat_trend_rsi,
+        "VOLATILITY_FILTER": _strat_volatility_filter,
+        "TURTLE": _strat_turtle,
+        "KELTNER": _strat_keltner,
+    }
+
+    def run_grid(self, strategy_type: str, param_grid: list, capital: float = 10000.0, fees: float = 0.001, slippage: float = 0.001,
+                 metrics_start: Optional[pd.Timestamp] = None, metrics_end: Optional[pd.Timestamp] = None):
+        """Evaluate one strategy over a list of param dicts in parallel.
+
+        Results come back in param_grid order. Threads rather than processes:
+        every worker already shares the engine's OHLCV arrays in-process, and
+        the heavy parts (numba kernels, vectorbt's simulation) release the
+        GIL, so a thread pool gets the core scaling without pickling price
+        data to workers or managing shared-memory segments.
+        """
+        if len(param_grid) <= 1:
+            return [self.run_strategy(strategy_type, p, capital, fees, slippage,
+                                      metrics_start, metrics_end) for p in param_grid]
+        workers = min(len(param_grid), os.cpu_count() or 4)
+        with concurrent.futures.ThreadPoolExecutor(max_workers=workers) as pool:
+            futures = [pool.submit(self.run_strategy, strategy_type, p, capital, fees,
+                                   slippage, metrics_start, metrics_end) for p in param_grid]
+            return [f.result(timeout=120) for f in futures]
+
     def run_strategy(self, strategy_type: str, params: dict, capital: float = 10000.0, fees: float = 0.001, slippage: float = 0.001,
                      metrics_start: Optional[pd.Timestamp] = None, metrics_end: Optional[pd.Timestamp] = None):
         
-        entries = pd.Series(False, index=self.close.index)
-        exits = pd.Series(False, index=self.close.index)
+        # None sentinels: the all-False Series only get allocated on the rare
+        # unknown-strategy/error paths instead of being built and immediately
+        # replaced on every successful call
+        entries = exits = None
         indicators = {}
 
-        try:
-            # --- 1. 基础策略 (Trend & Mean Reversion) ---
-            if strategy_type == "SMA_CROSSOVER":
-                s_window = int(params.get('shortWindow', 20))
-                l_window = int(params.get('longWindow', 50))
-                fast_ma = vbt.MA.run(self.close, s_window)
-                slow_ma = vbt.MA.run(self.close, l_window)
-                entries = fast_ma.ma_crossed_above(slow_ma)
-                exits = fast_ma.ma_crossed_below(slow_ma)
-                indicators['smaShort'] = fast_ma.ma
-                indicators['smaLong'] = slow_ma.ma
-
-            elif strategy_type == "EMA_CROSSOVER":
-                s_window = int(params.get('shortWindow', 20))
-                l_window = int(params.get('longWindow', 50))
-                fast_ma = vbt.MA.run(self.close, s_window, ewm=True)
-                slow_ma = vbt.MA.run(self.close, l_window, ewm=True)
-                entries = fast_ma.ma_crossed_above(slow_ma)
-                exits = fast_ma.ma_crossed_below(slow_ma)
-                indicators['emaShort'] = fast_ma.ma
-                indicators['emaLong'] = slow_ma.ma
-
-            elif strategy_type == "RSI_REVERSAL":
-                period = int(params.get('rsiPeriod', 14))
-                rsi = vbt.RSI.run(self.close, window=period)
-                entries = rsi.rsi_crossed_below(int(params.get('rsiOversold', 30)))
-                exits = rsi.rsi_crossed_above(int(params.get('rsiOverbought', 70)))
-                indicators['rsi'] = rsi.rsi
-
-            elif strategy_type == "BOLLINGER_BANDS":
-                bb = vbt.BBANDS.run(self.close, window=int(params.get('bbPeriod', 20)), alpha=float(params.get('bbStdDev', 2.0)))
-                entries = self.close < bb.lower
-                exits = self.close > bb.upper
-                indicators['upperBand'] = bb.upper
-                indicators['lowerBand'] = bb.lower
-                
-            elif strategy_type == "MACD":
-                macd = vbt.MACD.run(self.close, fast_window=int(params.get('macdFast', 12)), slow_window=int(params.get('macdSlow', 26)), signal_window=int(params.get('macdSignal', 9)))
-                entries = macd.macd_crossed_above(macd.signal)
-                exits = macd.macd_crossed_below(macd.signal)
-                indicators['macd'] = macd.macd
-                indicators['macdSignal'] = macd.signal
-                indicators['macdHist'] = macd.hist
-            
-            elif strategy_type == "MOMENTUM":
-                roc = (self.close.diff(int(params.get('rocPeriod', 12))) / self.close.shift(int(params.get('rocPeriod', 12)))) * 100
-                entries = (roc > 0) & (roc.shift(1) <= 0)
-                exits = (roc < 0) & (roc.shift(1) >= 0)
-                indicators['roc'] = roc
-
-            # --- 2. 进阶策略 (Advanced Filters & Breakouts) ---
-            
-            # A. 双重确认 (Trend + RSI)
-            elif strategy_type == "TREND_RSI":
-                ma = vbt.MA.run(self.close, int(params.get('trendMa', 200)))
-                rsi = vbt.RSI.run(self.close, window=int(params.get('rsiPeriod', 14)))
-                # 只有在大趋势向上时，才允许抄底
-                entries = (self.close > ma.ma) & rsi.rsi_crossed_below(int(params.get('rsiOversold', 30)))
-                exits = rsi.rsi_crossed_above(70) | (self.close < ma.ma) # 止盈或趋势破位止损
-                indicators['smaLong'] = ma.ma
-                indicators['rsi'] = rsi.rsi
-
-            # B. 波动率过滤 (Volatility Filter)
-            elif strategy_type == "VOLATILITY_FILTER":
-                adx_period = int(params.get('adxPeriod', 14))
-                adx_threshold = int(params.get('adxThreshold', 25))
-                # 基础均线信号
-                fast_ma = vbt.MA.run(self.close, 10)
-                slow_ma = vbt.MA.run(self.close, 50)
-                base_entries = fast_ma.ma_crossed_above(slow_ma)
-                base_exits = fast_ma.ma_crossed_below(slow_ma)
-                
-                # ADX 计算
-                adx = self._calculate_adx(adx_period)
-                is_trending = adx > adx_threshold
-                
-                # 过滤信号：只有在趋势强劲时才开仓
-                entries = base_entries & is_trending
-                exits = base_exits # 出场通常不需要过滤，或者也可以强制止损
-                
-                indicators['smaShort'] = fast_ma.ma
-                indicators['smaLong'] = slow_ma.ma
-                # indicators['adx'] = adx # 前端目前还没画 ADX 的图，暂不传
-
-            # C. 海龟法则 (Turtle / Donchian)
-            elif strategy_type == "TURTLE":
-                entry_window = int(params.get('turtleEntry', 20))
-                exit_window = int(params.get('turtleExit', 10))
-                
-                # Donchian Channel
-                high_n = self.high.rolling(entry_window).max().shift(1)
-                low_n = self.low.rolling(exit_window).min().shift(1)
-                
-                entries = self.close > high_n
-                exits = self.close < low_n
-                
-                indicators['upperBand'] = high_n
-                indicators['lowerBand'] = low_n
-
-            # D. 肯特纳通道 (Keltner Channels)
-            elif strategy_type == "KELTNER":
-                ema_period = int(params.get('keltnerPeriod', 20))
-                atr_mult = float(params.get('keltnerMult', 2.0))
-                
-                # Keltner 计算
-                middle = vbt.MA.run(self.close, window=ema_period, ewm=True).ma
-                atr = vbt.ATR.run(self.high, self.low, self.close, window=10).atr
-                
-                upper = middle + (atr * atr_mult)
-                lower = middle - (atr * atr_mult)
-                
-                # 突破上轨买入 (趋势策略)
-                entries = self.close > upper
-                # 跌破中轨卖出 (或者跌破下轨，看激进程度，这里选跌破中轨保护利润)
-                exits = self.close < middle
-                
-                indicators['upperBand'] = upper
-                indicators['lowerBand'] = lower
-                indicators['emaShort'] = middle
+        sig_key = (self._data_hash, strategy_type, repr(sorted(params.items())))
+        cached_signals = _SIGNAL_CACHE.get(sig_key)
+        if cached_signals is not None:
+            entries, exits, indicators = cached_signals
+            return self._simulate(entries, exits, indicators, params, capital, fees, slippage,
+                                  metrics_start, metrics_end)
 
+        try:
+            handler = self._STRATS.get(strategy_type)
+            if handler is not None:
+                entries, exits, indicators = handler(self, params)
         except Exception as e:
-            print(f"Strategy Calc Error: {e}")
-            entries = pd.Series(False, index=self.close.index)
+            log.error("Strategy Calc Error: %s", e)
+            entries = exits = None
+
+        if entries is None:
+            entries = pd.Series(False, index=self.index)
+        if exits is None:
+            exits = pd.Series(False, index=self.index)
 
+        with _SIGNAL_LOCK:
+            _SIGNAL_CACHE[sig_key] = (entries, exits, indicators)
+            if len(_SIGNAL_CACHE) > _SIGNAL_CACHE_MAX:
+                _SIGNAL_CACHE.pop(next(iter(_SIGNAL_CACHE)), None)
+
+        return self._simulate(entries, exits, indicators, params, capital, fees, slippage,
+                              metrics_start, metrics_end)
+
+    def _simulate(self, entries, exits, indicators, params, capital, fees, slippage,
+                  metrics_start, metrics_end):
+        """Portfolio simulation + metrics for a precomputed signal set; split
+        out of run_strategy so memoized signals skip straight to it."""
         # --- 残酷现实 & 风控 ---
-        real_entries = entries.vbt.signals.fshift(1).fillna(False)
-        real_exits = exits.vbt.signals.fshift(1).fillna(False)
+        real_entries = _fshift1(entries.to_numpy())
+        real_exits = _fshift1(exits.to_numpy())
         
         sl_stop = params.get('stopLoss', 0) / 100.0
         tp_stop = params.get('takeProfit', 0) / 100.0
@@ -183,8 +331,11 @@ class SakuraEngine:
         ts = ts_stop if ts_stop > 0 else None
 
         # 如果启用追踪止损，覆盖普通止损
+        # Raw ndarrays in: from_signals accepts them directly and skips its
+        # pandas alignment/conversion layer. Dates never enter the simulation;
+        # everything downstream maps bar positions through self.index.
         run_params = {
-            "close": self.close, "entries": real_entries, "exits": real_exits, "price": self.open,
+            "close": self.close_a, "entries": real_entries, "exits": real_exits, "price": self.open_a,
             "fees": fees, "slippage": slippage, "init_cash": capital, "freq": '1D',
             "size": 1.0, "size_type": 'percent', "accumulate": True,
             "tp_stop": tp
@@ -198,70 +349,85 @@ class SakuraEngine:
 
         pf = vbt.Portfolio.from_signals(**run_params)
 
-        # If a metrics window is provided, slice the portfolio to this window
-        pf_used = pf
-        try:
-            if metrics_start is not None and metrics_end is not None:
-                # Use time-based slicing; vectorbt Portfolio supports .loc over the underlying index
-                pf_used = pf.loc[metrics_start:metrics_end]
-        except Exception:
-            # Fall back to original portfolio if slicing not supported
-            pf_used = pf
-
         # --- 1. Generate Trades List First (to get accurate count) ---
         trades_list = []
         try:
-            orders_record = pf.orders.records_readable
-            if not orders_record.empty:
-                for i, row in orders_record.iterrows():
-                    dt = row['Timestamp']
-                    date_str = dt.strftime('%Y-%m-%d') if hasattr(dt, 'strftime') else str(dt)
-                    # Filter orders outside the requested metrics window if provided
-                    if metrics_start is not None and metrics_end is not None and hasattr(dt, 'to_pydatetime'):
-                        try:
-                            if dt < metrics_start or dt > metrics_end:
-                                continue
-                        except Exception:
-                            pass
-                    side = row['Side']
-                    type_str = "BUY" if side == 'Buy' else "SELL"
+            # Straight off the structured records array: records_readable
+            # re-renders every record into a human-readable DataFrame (string
+            # sides, mapped timestamps) just for us to convert it back
+            rec = pf.orders.records_arr
+            if rec.size:
+                order_idx = rec['idx']
+                prices = rec['price']
+                sides = rec['side']  # 0 = buy, 1 = sell
+                if metrics_start is not None and metrics_end is not None:
+                    # Window filter on bar positions via binary search instead
+                    # of comparing every timestamp
+                    dates64 = self.index.values
+                    lo = np.searchsorted(dates64, metrics_start.to_datetime64(), side='left')
+                    hi = np.searchsorted(dates64, metrics_end.to_datetime64(), side='right')
+                    keep = (order_idx >= lo) & (order_idx < hi)
+                    order_idx, prices, sides = order_idx[keep], prices[keep], sides[keep]
+                date_strs = np.datetime_as_string(self.index.values[order_idx].astype('datetime64[D]'), unit='D')
+                for date_str, side, price in zip(date_strs, sides, prices):
                     trades_list.append({
                         "date": date_str,
-                        "type": type_str,
-                        "price": float(row['Price']),
-                        "reason": "Signal / Risk Trigger" 
+                        "type": "BUY" if side == 0 else "SELL",
+                        "price": float(price),
+                        "reason": "Signal / Risk Trigger"
                     })
             trades_list.sort(key=lambda x: x['date'])
         except Exception as e:
-            print(f"Orders Parsing Error: {e}")
+            log.error("Orders Parsing Error: %s", e)
             trades_list = []
 
         # --- 2. Calculate Metrics ---
-        sharpe = pf_used.sharpe_ratio()
-        if np.isnan(sharpe): sharpe = 0.0
-        
-        # Calculate "Positive Time" - percentage of time capital stays above initial capital
+        # Metrics are pure O(N) functions of the equity curve, so derive them
+        # all from a numpy slice of pf.value(). The old pf.loc[start:end]
+        # re-ran the whole cash/position simulation just to change the
+        # display window.
         try:
-            portfolio_value = pf_used.value()
-            start_value = float(portfolio_value.iloc[0])
-            positive_days = (portfolio_value >= start_value).sum()
-            total_days = len(portfolio_value)
-            positive_time_rate = (positive_days / total_days) if total_days > 0 else 0.0
-        except Exception:
-            positive_time_rate = 0.0
-            start_value = float(capital)
-        
-        # For consistency within the visible window, set initialCapital to the equity at the window start
-        try:
-            start_value = float(pf_used.value().iloc[0])
+            v = np.asarray(pf.value())
+            if metrics_start is not None and metrics_end is not None:
+                # The portfolio runs on bare arrays, so resolve the window on
+                # the engine's DatetimeIndex (same bar positions)
+                i0 = int(self.index.searchsorted(metrics_start, side='left'))
+                i1 = int(self.index.searchsorted(metrics_end, side='right'))
+                if i0 < i1:
+                    v = v[i0:i1]
+            if v.size == 0:
+                raise ValueError("empty equity curve")
+            start_value = float(v[0])
+            rets = np.diff(v) / v[:-1]
+            sharpe = 0.0
+            if rets.size > 1:
+                sd = float(np.nanstd(rets, ddof=1))
+                if sd > 0:
+                    # Annualized over 252 trading days. This deliberately
+                    # differs from pf.sharpe_ratio(), whose default year_freq
+                    # of 365 days scaled by sqrt(365) and so reported values
+                    # about 20% larger for the same daily returns.
+                    sharpe = float(np.sqrt(252.0) * np.nanmean(rets) / sd)
+            if np.isnan(sharpe): sharpe = 0.0
+            # "Positive Time" - percentage of time capital stays above initial capital
+            positive_time_rate = float((v >= start_value).sum()) / v.size
+            max_dd = float((v / np.maximum.accumulate(v) - 1.0).min())
+            total_return = float(v[-1] / v[0] - 1.0)
+            final_value = float(v[-1])
         except Exception:
             start_value = float(capital)
+            sharpe = 0.0
+            positive_time_rate = 0.0
+            max_dd = 0.0
+            total_return = 0.0
+            final_value = float(capital)
 
         metrics = {
-            "totalReturn": float(pf_used.total_return() * 100),
-            "finalCapital": float(pf_used.final_value()),
+            "totalReturn": float(total_return * 100),
+            "finalCapital": final_value,
+            # Equity at the window start, for consistency within the visible window
             "initialCapital": start_value,
-            "maxDrawdown": float(pf_used.max_drawdown() * 100),
+            "maxDrawdown": float(max_dd * 100),
             "winRate": float(positive_time_rate * 100),  # Now shows % of time above initial capital
             "tradeCount": len(trades_list), # EXACTLY matches the visible trades list
             "sharpeRatio": float(sharpe)
@@ -42,7 +42,21 @@ export const runBacktest = async (_ignoredData: any[], strategy: StrategyType, p
       body: JSON.stringify({ ticker, startDate: dateRange.start, endDate: dateRange.end, strategy, params, fees, slippage })
     });
     if (!response.ok) throw new Error(await response.text());
-    return await response.json();
+    const raw = await response.json();
+    // 后端返回列式 (SoA) data，传输体积更小；这里拼回行对象，组件不用改
+    const cols = raw.data;
+    const keys = Object.keys(cols);
+    const n = cols.date.length;
+    const data = new Array(n);
+    for (let i = 0; i < n; i++) {
+      const row: any = {};
+      for (const k of keys) {
+        const v = cols[k][i];
+        if (v !== null && v !== undefined) row[k] = v;
+      }
+      data[i] = row;
+    }
+    return { data, trades: raw.trades, metrics: raw.metrics };
   } catch (e: any) { console.error("Backtest Service Error:", e); throw new Error(e.message || "Network Error"); }
 };
 